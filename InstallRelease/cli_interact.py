@@ -1,12 +1,9 @@
 import os
+import atexit
 from typing import Dict
 from tempfile import TemporaryDirectory
 import platform
 
-# pipi
-from rich.progress import track
-from rich.console import Console
-
 # locals
 from InstallRelease.state import State, platform_path
 from InstallRelease.data import GithubRelease, ToolConfig, irKey
@@ -25,10 +22,13 @@ from InstallRelease.utils import (
     requests_session,
 )
 
-from InstallRelease.core import get_release, extract_release, install_bin, GithubInfo
-
-
-console = Console(width=40)
+from InstallRelease.core import (
+    get_release,
+    match_previous_asset,
+    extract_release,
+    install_bin,
+    GithubInfo,
+)
 
 install_release_version = PackageVersion("install-release")
 
@@ -52,6 +52,10 @@ cache_config = State(
     obj=ToolConfig,
 )
 
+# write out any set()/pop() changes not saved explicitly
+atexit.register(cache.flush)
+atexit.register(cache_config.flush)
+
 
 def load_config():
     """
@@ -113,7 +117,16 @@ def get(
 
     at = TemporaryDirectory(prefix=f"dn_{repo.repo_name}_")
 
-    _gr = get_release(releases=releases, repo_url=repo.repo_url, extra_words=[toolname])
+    # reuse the naming of the installed asset before scoring all assets
+    _gr = None
+    previous = cache.get(f"{repo.repo_url}#{toolname}")
+    if isinstance(previous, GithubRelease):
+        _gr = match_previous_asset(previous, releases[0])
+
+    if _gr is None:
+        _gr = get_release(
+            releases=releases, repo_url=repo.repo_url, extra_words=[toolname]
+        )
 
     logger.debug(_gr)
 
@@ -165,14 +178,17 @@ def get(
     #     logger.debug(f"hold_update={check_key.hold_update}")
     #     releases[0].hold_update = True
 
-    cache.set(f"{repo.repo_url}#{toolname}", value=releases[0])
-    cache.save()
+    # saved right away, or once at the end when called inside `with cache:`
+    cache[f"{repo.repo_url}#{toolname}"] = releases[0]
 
 
 def upgrade(force: bool = False, skip_prompt: bool = False):
     """
     | Upgrade all tools
     """
+    from rich.progress import track
+    from rich.console import Console
+
     state_info()
 
     state: TypeState = cache.state
@@ -200,7 +216,7 @@ def upgrade(force: bool = False, skip_prompt: bool = False):
     # ask prompt to upgrade listed tools
     if len(upgrades) > 0:
         pprint("\n[bold magenta]Following tool will get upgraded.\n")
-        console.print("[bold yellow]" + " ".join(upgrades.keys()))
+        Console(width=40).print("[bold yellow]" + " ".join(upgrades.keys()))
         pprint("[bold blue]Upgrade these tools, (Y/n):", end=" ")
 
         if skip_prompt == False:
@@ -211,17 +227,18 @@ def upgrade(force: bool = False, skip_prompt: bool = False):
         pprint("[bold green]All tools are onto latest version")
         return
 
-    for name in track(upgrades, description="Upgrading..."):
-        repo = upgrades[name]
-        releases = repo.release()
-        k = f"{repo.repo_url}#{name}"
+    with cache:
+        for name in track(upgrades, description="Upgrading..."):
+            repo = upgrades[name]
+            releases = repo.release()
+            k = f"{repo.repo_url}#{name}"
 
-        pprint(
-            "[bold yellow]"
-            f"Updating: {name}, {state[k].tag_name} => {releases[0].tag_name}"
-            "[/]"
-        )
-        get(repo, prompt=False, name=name)
+            pprint(
+                "[bold yellow]"
+                f"Updating: {name}, {state[k].tag_name} => {releases[0].tag_name}"
+                "[/]"
+            )
+            get(repo, prompt=False, name=name)
 
 
 def show_state():
@@ -282,20 +299,14 @@ def remove(name: str):
     | Remove any cli tool.
     """
     state_info()
-    state: TypeState = cache.state
-    popKey = ""
-
-    for key in state:
-        i = irKey(key)
-        if i.name == name:
-            popKey = key
-            if os.path.exists(f"{dest}/{name}"):
-                os.remove(f"{dest}/{name}")
-            break
+    popKey = next((key for key in cache.keys() if irKey(key).name == name), "")
 
     if popKey != "":
-        del state[popKey]
-        cache.save()
+        try:
+            os.unlink(f"{dest}/{name}")
+        except FileNotFoundError:
+            ...
+        del cache[popKey]
         logger.info(f"Removed: {name}")
 
 
@@ -360,15 +371,16 @@ def pull_state(url: str = "", override: bool = False):
     if _i.lower() != "y":
         return
 
-    for key in temp:
-        try:
-            i = irKey(key)
-        except:
-            logger.warning(f"Invalid input: {key}")
-            continue
-        get(
-            GithubInfo(i.url, token=config.token),
-            tag_name=temp[key].tag_name,
-            prompt=False,
-            name=i.name,
-        )
+    with cache:
+        for key in temp:
+            try:
+                i = irKey(key)
+            except:
+                logger.warning(f"Invalid input: {key}")
+                continue
+            get(
+                GithubInfo(i.url, token=config.token),
+                tag_name=temp[key].tag_name,
+                prompt=False,
+                name=i.name,
+            )
@@ -3,6 +3,7 @@ import platform
 
 
 HOME = os.path.expanduser("~")
+SYSTEM = platform.system().lower()
 
 __bin_at__ = "bin"
 __dir_name__ = "install_release"
@@ -31,30 +32,46 @@ config_path = {
     "darwin": f"{HOME}/Library/.config/{__config_at__}",
 }
 
+cache_path = {
+    "linux": f"{HOME}/.cache/{__dir_name__}",
+    "darwin": f"{HOME}/Library/Caches/{__dir_name__}",
+}
+
 bin_path = {
     "linux": f"{HOME}/{__bin_at__}",
     "darwin": f"{HOME}/{__bin_at__}",
 }
 
 
-def platform_words() -> list:
-    aliases = {
-        "x86_64": ["x86", "x64", "amd64", "amd", "x86_64"],
-        "aarch64": ["arm64", "aarch64", "arm"],
-    }
+# machine name aliases used in release asset names
+_arch_aliases = {
+    "x86_64": ("x86", "x64", "amd64", "amd", "x86_64"),
+    "aarch64": ("arm64", "aarch64", "arm"),
+}
+
+# reverse lookup: any alias -> its machine name
+_arch_alias_of = {
+    alias: machine for machine, aliases in _arch_aliases.items() for alias in aliases
+}
+
 
-    words = [platform.system().lower(), platform.architecture()[0]]
+def platform_words() -> list:
+    words = [SYSTEM, platform.architecture()[0]]
 
-    for alias in aliases:
-        if platform.machine().lower() in aliases[alias]:
-            words += aliases[alias]
+    machine = _arch_alias_of.get(platform.machine().lower())
+    if machine:
+        words += _arch_aliases[machine]
 
     try:
         sys_alias = platform.platform().split("-")[0].lower()
 
-        if platform.system().lower() != sys_alias:
+        if SYSTEM != sys_alias:
             words.append(sys_alias)
     except:
         ...
 
     return words
+
+
+# computed once per process, platform doesn't change while running
+PLATFORM_WORDS = frozenset(platform_words())
@@ -1,27 +1,57 @@
+import os
 import sys
 import re
-import glob
-import platform
+import shlex
 from typing import List
-
-# pipi
-import requests
-from requests.auth import HTTPBasicAuth
-from magic.compat import detect_from_filename
+from functools import cached_property
 
 # locals
-from InstallRelease.utils import logger, listItemsMatcher, extract, download, sh, is_none
+from InstallRelease.utils import (
+    logger,
+    listItemsMatcher,
+    extract,
+    download,
+    sh,
+    is_none,
+    detect_from_filename,
+    github_cache,
+    requests_session,
+)
 from InstallRelease.data import (
     GithubRelease,
     GithubReleaseAssets,
     GithubRepoInfo,
     _platform_words,
+    archive_extensions,
 )
-from InstallRelease.constants import HOME
+from InstallRelease.constants import HOME, SYSTEM
 
 # --------------- CODE ------------------
 
-__exec_pattern = r"application\/x-(\w+-)?(executable|binary)"
+# fallback when no token is set with `ir config --token`
+_env_token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
+
+__exec_pattern = re.compile(r"application\/x-(\w+-)?(executable|binary)")
+
+# files shipped next to release binaries, never worth a libmagic probe;
+# no numeric suffixes, binaries like `tool-v1.2.1` would end up in ".1"
+_skip_extensions = frozenset(
+    {
+        ".md",
+        ".txt",
+        ".json",
+        ".yml",
+        ".yaml",
+        ".html",
+        ".png",
+        ".svg",
+        ".sha256",
+        ".asc",
+        ".sig",
+    }
+    # last suffix only, e.g. ".tar.gz" -> ".gz", as checked by splitext()
+    | {"." + ext.rsplit(".", 1)[1] for ext in archive_extensions}
+)
 
 
 class GithubInfo:
@@ -50,21 +80,41 @@ class GithubInfo:
         self.token = token
 
         self.data = data
-        self.info: GithubRepoInfo = GithubRepoInfo(**self._req(self.api))
+
+    @cached_property
+    def info(self) -> GithubRepoInfo:
+        # fetched only when shown, e.g. in the install prompt
+        return GithubRepoInfo(**self._req(self.api))
 
     def _req(self, url):
-        if not is_none(self.token):
-            auth = HTTPBasicAuth("user", self.token)
+        headers = dict(self.headers)
+
+        token = self.token if not is_none(self.token) else _env_token
+        if token:
+            headers["Authorization"] = f"token {token}"
         else:
             logger.debug("Token not set")
-            auth = HTTPBasicAuth("user", "pass")
 
-        response = requests.get(
+        # conditional request: a 304 reply reuses the cached body and
+        # doesn't count against the GitHub rate limit
+        cached = github_cache.get(url)
+        if cached:
+            headers["If-None-Match"] = cached["etag"]
+
+        resp = requests_session.get(
             url,
-            headers=self.headers,
-            auth=auth,
+            headers=headers,
             json=self.data,
-        ).json()
+        )
+
+        if resp.status_code == 304 and cached:
+            logger.debug(f"not modified: {url}")
+            response = cached["body"]
+        else:
+            response = resp.json()
+            etag = resp.headers.get("ETag")
+            if resp.status_code == 200 and etag:
+                github_cache.set(url, etag, response)
 
         if isinstance(response, dict):
             if response.get("message"):
@@ -121,28 +171,32 @@ class installRelease:
     }
 
     def __init__(self, source: str, name: str = None) -> None:
-        pl = platform.system()
-        self.paths = self.bin_path[pl.lower()]
-        self.pl = pl
+        self.paths = self.bin_path[SYSTEM]
+        self.pl = SYSTEM
         self.source = source
         self.name = name
 
     def install(self, local: bool, at: str):
-        system = platform.system().lower()
-
-        if system == "linux":
+        if SYSTEM == "linux":
             return self._install_linux(local, at)
-        elif system == "darwin":
+        elif SYSTEM == "darwin":
             return self._install_darwin(local, at)
 
     def _install_linux(self, local: bool, at: str = None):
         if local:
-            cmd = f"install {self.source} {at or self.paths['local']}"
+            target = at or self.paths["local"]
         else:
-            cmd = f"sudo install {self.source} {at or self.paths['global']}"
+            target = at or self.paths["global"]
+
+        # no /bin/sh to expand it, e.g. `ir config --path ~/.local/bin`
+        target = os.path.expanduser(target)
 
         if self.name:
-            cmd += f"/{self.name}"
+            target += f"/{self.name}"
+
+        cmd = f"install {shlex.quote(self.source)} {shlex.quote(target)}"
+        if not local:
+            cmd = f"sudo {cmd}"
 
         logger.info(cmd)
         out = sh(cmd)
@@ -167,12 +221,11 @@ def get_release(releases: List[GithubRelease], repo_url: str, extra_words: list
     Get the release with the highest priority
     """
     selected = 0.0
-    name = ""
 
     # temp fix: install not configured for distro based on platform
-    platform_words = _platform_words + ["(.tar|.zip)"]
+    platform_words = _platform_words
 
-    logger.debug(msg=("platform_words: ", platform_words))
+    logger.debug(msg=("platform_words: ", platform_words, archive_extensions))
 
     if len(releases) == 0:
         logger.warning(f"No releases found for: {repo_url}")
@@ -188,24 +241,21 @@ def get_release(releases: List[GithubRelease], repo_url: str, extra_words: list
         logger.warning(f"No release assets found for: {repo_url}")
         return False
 
-    _index: int = int()
+    patterns = platform_words + extra_words
+
+    # first asset with the highest non-zero score wins
+    _index: int = -1
     for index, e in enumerate(release.assets):
         match = listItemsMatcher(
-            patterns=platform_words + extra_words, word=e.name.lower()
+            patterns=patterns, word=e.name, suffixes=archive_extensions
         )
         logger.debug(f"name: '{e.name}', chances: {match}")
 
-        if match > 0:
-            if selected == 0:
-                selected = match
-                name = e.name
-                _index = index
-            elif match > selected:
-                selected = match
-                name = e.name
-                _index = index
-
-    if name == "":
+        if match > selected:
+            selected = match
+            _index = index
+
+    if _index == -1:
         logger.warn(f"No match release prefix match found for {repo_url}")
         return False
 
@@ -222,6 +272,32 @@ def get_release(releases: List[GithubRelease], repo_url: str, extra_words: list
     return item
 
 
+def match_previous_asset(previous: GithubRelease, release: GithubRelease):
+    """
+    Find the asset named like the previously installed one, with the
+    version swapped, eg: tool_1.2.0_linux.tar.gz -> tool_1.3.0_linux.tar.gz
+    """
+    if len(previous.assets) == 0:
+        return None
+
+    old_name = previous.assets[0].name
+
+    for old, new in [
+        (previous.tag_name, release.tag_name),
+        (previous.tag_name.lstrip("v"), release.tag_name.lstrip("v")),
+    ]:
+        if old == "" or old not in old_name:
+            continue
+
+        candidate = old_name.replace(old, new)
+        for asset in release.assets:
+            if asset.name == candidate:
+                logger.debug(f"Matched previous asset: '{old_name}' -> '{candidate}'")
+                return asset
+
+    return None
+
+
 def extract_release(item: GithubReleaseAssets, at):
     """
     Download and extract release
@@ -232,8 +308,9 @@ def extract_release(item: GithubReleaseAssets, at):
     logger.debug(f"path: {path}")
 
     logger.debug(f"Extracting: {path}")
-    if not re.match(
-        pattern=__exec_pattern, string=detect_from_filename(path).mime_type
+    # archives by name need no libmagic check for a bare executable
+    if item.name.lower().endswith(archive_extensions) or not __exec_pattern.match(
+        detect_from_filename(path).mime_type
     ):
         extract(path=path, at=at)
         logger.debug("Extracting done.")
@@ -241,20 +318,37 @@ def extract_release(item: GithubReleaseAssets, at):
     return True
 
 
+def _walk_files(root: str):
+    """yield file paths below root, using scandir's cached entry types"""
+
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    yield entry.path
+
+
 def install_bin(src: str, dest: str, local: bool, name: str = None):
     """
     Install single binary executable file from source to destination
     """
     bin_files = []
 
-    for file in glob.iglob(f"{src}/**", recursive=True):
-        f = detect_from_filename(file)
-        if f.name == "directory":
+    for file in _walk_files(src):
+        if os.path.splitext(file)[1].lower() in _skip_extensions:
             continue
-        elif not re.match(pattern=__exec_pattern, string=f.mime_type):
+
+        f = detect_from_filename(file)
+        if not __exec_pattern.match(f.mime_type):
             continue
 
         bin_files.append(file)
+        # more than one candidate is already an error, stop probing
+        if len(bin_files) > 1:
+            break
 
     if len(bin_files) > 1 or len(bin_files) == 0:
         logger.error(f"Expect single binary file got more or less:\n{bin_files}")
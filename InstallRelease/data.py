@@ -1,17 +1,36 @@
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Dict, Optional
 from dataclasses import dataclass, fields, field
 
 # locals
-from InstallRelease.constants import platform_words
+from InstallRelease.constants import PLATFORM_WORDS
 
-_platform_words = platform_words()
+# deduplicated, sorted for stable debug output
+_platform_words = sorted(PLATFORM_WORDS)
 
 
 exception_compressed_mime_type = [
     "application/x-7z-compressed",
 ]
 
+tar_extensions = (
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.xz",
+    ".txz",
+    ".tar.bz2",
+    ".tbz2",
+)
+
+archive_extensions = tar_extensions + (".zip", ".7z")
+
+
+@lru_cache(maxsize=None)
+def _field_names(cls) -> frozenset:
+    return frozenset(f.name for f in fields(cls))
+
 
 @dataclass
 class OsInfo:
@@ -30,7 +49,7 @@ class GithubRepoInfo:
     stargazers_count: int
 
     def __init__(self, **kwargs):
-        names = set([f.name for f in fields(self)])
+        names = _field_names(type(self))
         for k, v in kwargs.items():
             if k in names:
                 setattr(self, k, v)
@@ -50,7 +69,7 @@ class GithubReleaseAssets:
     updated_at: str
 
     def __init__(self, **kwargs):
-        names = set([f.name for f in fields(self)])
+        names = _field_names(type(self))
         for k, v in kwargs.items():
             if k in names:
                 setattr(self, k, v)
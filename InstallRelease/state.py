@@ -1,59 +1,93 @@
 import os
-import json
-import platform
 from typing import Dict
 import dataclasses
 
 # locals
-from InstallRelease.utils import logger, EnhancedJSONEncoder, FilterDataclass, is_none
+from InstallRelease.constants import SYSTEM
+from InstallRelease.utils import (
+    logger,
+    json_dumps,
+    json_loads,
+    write_atomic,
+    FilterDataclass,
+    is_none,
+)
 
 
 def platform_path(paths: dict, alt: str = ""):
     """provide path base on platform"""
 
-    system = platform.system().lower()
-
     if not is_none(alt) and alt != "null":
         return alt
 
-    elif paths.get(system):
-        p = paths.get(system)
+    elif paths.get(SYSTEM):
+        p = paths.get(SYSTEM)
 
-        if not os.path.exists(os.path.dirname(p)):
-            os.makedirs(os.path.dirname(p))
+        os.makedirs(os.path.dirname(p), exist_ok=True)
         return p
     else:
-        logger.error(f"No state dir path set for {system}")
+        logger.error(f"No state dir path set for {SYSTEM}")
         exit(1)
 
 
 class State:
     def __init__(self, file_path: str, obj):
         self.state: dict = {}
-        self.cache: object
         self.state_file = file_path
         self.obj = obj
+        self._dirty = False
+        self._batching = 0
         self.load()
 
     def load(self):
+        if not dataclasses.is_dataclass(self.obj):
+            return
+
         if os.path.exists(self.state_file):
-            with open(self.state_file, "r") as f:
-                _s = json.load(f)
-                if len(_s) == 0:
-                    return
-                for k in _s:
-                    if dataclasses.is_dataclass(self.obj):
-                        self.state[k] = FilterDataclass(_s[k], obj=self.obj)
+            with open(self.state_file, "rb") as f:
+                try:
+                    _s = json_loads(f.read())
+                except ValueError:
+                    _s = None
+
+            if not isinstance(_s, dict):
+                # e.g. empty or truncated file from an interrupted write, keep
+                # it aside so the next save doesn't discard what it recorded
+                backup = self.state_file + ".bak"
+                os.replace(self.state_file, backup)
+                logger.warning(
+                    f"Unreadable state {self.state_file}, moved to: {backup}"
+                )
+                return
+
+            self.state.update(
+                {k: FilterDataclass(v, obj=self.obj) for k, v in _s.items()}
+            )
 
     def save(self):
-        with open(self.state_file, "w") as f:
-            json.dump(self.state, f, cls=EnhancedJSONEncoder)
+        """write state to a temp file and atomically swap it in"""
+
+        write_atomic(self.state_file, json_dumps(self.state))
+        self._dirty = False
+
+    def flush(self):
+        """save only if state changed since the last write"""
+
+        if self._dirty:
+            self.save()
+
+    def _changed(self):
+        self._dirty = True
+        if self._batching == 0:
+            self.save()
 
     def get(self, key: str) -> Dict:
         return self.state.get(key)  # type: ignore
 
     def set(self, key: str, value):
+        # unlike item assignment this doesn't save, see flush()
         self.state[key] = value
+        self._dirty = True
 
     def items(self):
         return self.state.items()
@@ -63,17 +97,28 @@ class State:
 
     def pop(self, key: str):
         self.state.pop(key)
+        self._dirty = True
 
     def __getitem__(self, key: str) -> Dict:
         return self.state[key]
 
     def __setitem__(self, key: str, value: Dict):
         self.state[key] = value
-        self.save()
+        self._changed()
 
     def __delitem__(self, key: str):
         del self.state[key]
-        self.save()
+        self._changed()
+
+    def __enter__(self):
+        # defer saves from item assignment/deletion until the block exits
+        self._batching += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._batching -= 1
+        if self._batching == 0:
+            self.flush()
 
     def __contains__(self, key: str) -> bool:
         return key in self.state
@@ -2,19 +2,25 @@ import os
 import re
 import sys
 import json
+import time
+import hashlib
+import shlex
 import shutil
+import tarfile
 import logging
-import platform
 import subprocess
 import dataclasses
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import version as dist_version, PackageNotFoundError
 
 # pipi
-import pkg_resources
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from rich import print as pprint
 from rich.console import Console
 from rich.logging import RichHandler
@@ -22,23 +28,45 @@ from rich.text import Text
 from rich.table import Table
 
 try:
-    from magic.compat import detect_from_filename
+    # optional, faster json (de)serialization for state files
+    import orjson
 except ImportError:
-    pprint(
-        "[red]Failed to find libmagic.  Check your installation\n"
-        "refer this url to install libmagic first: https://github.com/ahupp/python-magic#installation [/]"
-    )
-    sys.exit(1)
+    orjson = None
+
+try:
+    # optional, extract 7z archives without the 7z binary
+    import py7zr
+except ImportError:
+    py7zr = None
 
 # logging.basicConfig(level=logging.INFO)
 
 
 # locals
-from InstallRelease.constants import _colors
+from InstallRelease.constants import _colors, cache_path, HOME, SYSTEM, __dir_name__
+from InstallRelease.data import archive_extensions, tar_extensions
 
 requests_session = requests.Session()
 
-console = Console()
+# pool sized for threads() workers, retry transient GET failures
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=("GET",),
+    ),
+)
+requests_session.mount("https://", _adapter)
+requests_session.mount("http://", _adapter)
+
+
+@lru_cache(maxsize=None)
+def get_console() -> Console:
+    """shared rich console, created on first use"""
+    return Console()
 
 
 def _logger(flag: str = "", format: str = ""):
@@ -73,6 +101,21 @@ def _logger(flag: str = "", format: str = ""):
 logger = _logger("LOG_LEVEL")
 
 
+def detect_from_filename(path: str):
+    """libmagic file info, imported on first use to keep CLI startup light"""
+
+    try:
+        from magic.compat import detect_from_filename as _detect_from_filename
+    except ImportError:
+        pprint(
+            "[red]Failed to find libmagic.  Check your installation\n"
+            "refer this url to install libmagic first: https://github.com/ahupp/python-magic#installation [/]"
+        )
+        sys.exit(1)
+
+    return _detect_from_filename(path)
+
+
 class EnhancedJSONEncoder(json.JSONEncoder):
     def default(self, o):
         if dataclasses.is_dataclass(o):
@@ -80,6 +123,123 @@ class EnhancedJSONEncoder(json.JSONEncoder):
         return super().default(o)
 
 
+def json_dumps(data) -> bytes:
+    if orjson is not None:
+        # orjson serializes dataclasses natively
+        return orjson.dumps(data)
+    return json.dumps(data, cls=EnhancedJSONEncoder).encode()
+
+
+def json_loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_atomic(file_path: str, data: bytes):
+    """write to a temp file next to file_path, then swap it in"""
+
+    try:
+        mode: Optional[int] = os.stat(file_path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = None
+
+    # created like open() would, 0666 minus the umask (applied by the kernel)
+    tmp = f"{file_path}.{os.urandom(6).hex()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, file_path)
+    except BaseException:
+        # e.g. disk full, don't leave the temp file behind
+        os.unlink(tmp)
+        raise
+
+
+class PackageVersionCache:
+    """
+    Latest package versions persisted on disk, so repeated runs skip PyPI
+    until an entry is older than `ttl` seconds.
+    """
+
+    def __init__(self, file_path: str, ttl: int = 6 * 60 * 60):
+        self.file_path = file_path
+        self.ttl = ttl
+        self._data: Optional[dict] = None
+
+    def _load(self) -> dict:
+        if self._data is None:
+            try:
+                with open(self.file_path, "rb") as f:
+                    self._data = json_loads(f.read())
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data  # type: ignore
+
+    def get(self, package_name: str) -> Optional[str]:
+        entry = self._load().get(package_name)
+        if entry and time.time() - entry["fetched_at"] < self.ttl:
+            return entry["version"]
+        return None
+
+    def set(self, package_name: str, version: str):
+        data = self._load()
+        data[package_name] = {"version": version, "fetched_at": time.time()}
+
+        try:
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            write_atomic(self.file_path, json_dumps(data))
+        except OSError as e:
+            logger.debug(f"can't write version cache {self.file_path}: {e}")
+
+
+class ResponseCache:
+    """
+    Last response body and ETag per url, one json file each, used to make
+    conditional (If-None-Match) requests.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _path(self, url: str) -> str:
+        name = hashlib.sha1(url.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def get(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._path(url), "rb") as f:
+                return json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def set(self, url: str, etag: str, body):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_atomic(
+                self._path(url), json_dumps({"url": url, "etag": etag, "body": body})
+            )
+        except OSError as e:
+            logger.debug(f"can't write response cache for {url}: {e}")
+
+
+_cache_dir = cache_path.get(SYSTEM, f"{HOME}/.cache/{__dir_name__}")
+
+pypi_cache = PackageVersionCache(os.path.join(_cache_dir, "pypi.json"))
+
+github_cache = ResponseCache(os.path.join(_cache_dir, "github"))
+
+
+@lru_cache(maxsize=256)
+def _fetch_pypi_latest(url: str) -> str:
+    response = requests_session.get(url)
+    logger.debug(f"pipi response for '{url}': " + str(response))
+    return response.json()["info"]["version"]
+
+
 class PackageVersion:
     def __init__(self, package_name: str):
         self.package_name = package_name
@@ -89,9 +249,8 @@ class PackageVersion:
 
     def local_version(self):
         try:
-            version = pkg_resources.get_distribution(self.package_name).version
-            return version
-        except pkg_resources.DistributionNotFound:
+            return dist_version(self.package_name)
+        except PackageNotFoundError:
             return None
 
     def latest_version(self):
@@ -99,12 +258,10 @@ class PackageVersion:
             if self._latest_version != None:
                 return self._latest_version
 
-            response = requests_session.get(self.url)
-            logger.debug(
-                f"pipi response for package '{self.package_name}': " + str(response)
-            )
-            data = response.json()
-            version = data["info"]["version"]
+            version = pypi_cache.get(self.package_name)
+            if version is None:
+                version = _fetch_pypi_latest(self.url)
+                pypi_cache.set(self.package_name, version)
             self._latest_version = version
 
             return version
@@ -113,6 +270,10 @@ class PackageVersion:
             print(f"Failed to fetch data for {self.package_name}")
             return None
 
+    @classmethod
+    def clear_cache(cls):
+        _fetch_pypi_latest.cache_clear()
+
 
 def FilterDataclass(data: dict, obj):
     """"""
@@ -126,15 +287,8 @@ def FilterDataclass(data: dict, obj):
 
 
 def is_none(val):
-    if val == None:
-        return True
-    elif isinstance(val, str) and val != "":
-        return False
-    elif isinstance(val, dict) and val != {}:
-        return False
-    elif isinstance(val, list) and val != []:
-        return False
-    return True
+    """only a non-empty str, dict or list counts as set"""
+    return not (isinstance(val, (str, dict, list)) and val)
 
 
 @dataclass
@@ -144,18 +298,19 @@ class ShellOutputs:
     returncode: int
 
 
+_console_encoding = getattr(sys.__stdout__, "encoding", None) or "utf_8"
+
+
 class Shell:
     line_breaks = "\n"
-    popen_args = {"shell": True, "stdout": subprocess.PIPE, "stderr": subprocess.PIPE}
+    popen_args = {"stdout": subprocess.PIPE, "stderr": subprocess.PIPE}
 
     def console_to_str(self, s):
-        console_encoding = sys.__stdout__.encoding
-
-        """ From pypa/pip project, pip.backwardwardcompat. License MIT. """
+        """From pypa/pip project, pip.backwardwardcompat. License MIT."""
         if s is None:
             return
         try:
-            return s.decode(console_encoding, "ignore")
+            return s.decode(_console_encoding, "ignore")
         except UnicodeDecodeError:
             return s.decode("utf_8", "ignore")
 
@@ -168,15 +323,17 @@ class Shell:
             return text_type(s, encoding="utf_8")
 
     def cmd(self, cmd) -> ShellOutputs:
+        # run without an intermediate /bin/sh; callers quote with shlex.quote
+        args = shlex.split(cmd) if isinstance(cmd, str) else cmd
+
         try:
-            process = subprocess.Popen(cmd, **self.popen_args)  # type: ignore
+            process = subprocess.Popen(args, **self.popen_args)  # type: ignore
             stdout, stderr = process.communicate()
             returncode = process.returncode
 
         except Exception as e:
-            logger.error("Exception for %s: \n%s" % (subprocess.list2cmdline(cmd), e))
-
-        returncode = returncode
+            logger.error("Exception for %s: \n%s" % (subprocess.list2cmdline(args), e))
+            stdout, stderr, returncode = b"", str(e).encode(), 127
 
         stdout = self.console_to_str(stdout)
         stdout = stdout.split(self.line_breaks)
@@ -194,53 +351,94 @@ class Shell:
         return ShellOutputs(stdout=stdout, stderr=stderr, returncode=returncode)
 
 
+_shell = Shell()
+
+
 def sh(command: str):
-    s = Shell()
-    return s.cmd(command)
+    return _shell.cmd(command)
 
 
 def mkdir(path: str):
-    file_path = Path(path)
-    file_path = file_path.expanduser()
+    Path(path).expanduser().mkdir(parents=True, exist_ok=True)
 
-    if not file_path.is_dir():
-        logger.debug(f"creating dir: {file_path.absolute()}")
-        os.makedirs(name=file_path.absolute())
-    else:
-        ...
+
+_chunk_size = 1 << 20
 
 
 def download(url: str, at: str):
     """Download a file"""
 
-    file = requests_session.get(url, stream=True)
-    if not os.path.exists(at):
-        os.makedirs(at)
+    # assets are already compressed, don't ask for another encoding layer
+    file = requests_session.get(
+        url, stream=True, headers={"Accept-Encoding": "identity"}
+    )
+    os.makedirs(at, exist_ok=True)
 
     file_name: str = url.split("/")[-1]
-    if file.status_code == 200:
-        with open(f"{at}/{file_name}", "wb") as fw:
-            fw.write(file.content)
-        logger.info(f"""Downloaded: \'{file_name}\' at {at}""")
-        return f"{at}/{file_name}"
-    else:
-        logger.info(f"url: {url}, status_code: {file.status_code}")
-        exit()
+    with file:
+        if file.status_code == 200:
+            # stream body to disk in 1 MiB chunks instead of loading it in memory
+            file.raw.decode_content = True
+            with open(f"{at}/{file_name}", "wb", buffering=_chunk_size) as fw:
+                shutil.copyfileobj(file.raw, fw, length=_chunk_size)
+            logger.info(f"""Downloaded: \'{file_name}\' at {at}""")
+            return f"{at}/{file_name}"
+        else:
+            logger.info(f"url: {url}, status_code: {file.status_code}")
+            exit()
+
+
+# archive members never installed, left out while extracting
+_skip_members = (".md", ".txt", ".html")
+_license_names = ("license", "licence", "copying")
+
+
+def _is_doc_member(name: str) -> bool:
+    """docs and license files, matched on the basename so e.g. `addlicense` stays"""
+
+    base = os.path.basename(name).lower()
+    return base.endswith(_skip_members) or base.startswith(_license_names)
+
+
+def _extract_tar(path: str, at: str):
+    """stream a tar archive, extracting only regular, non-doc files"""
+
+    with tarfile.open(path, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile() or _is_doc_member(member.name):
+                continue
+            if hasattr(tarfile, "data_filter"):
+                tf.extract(member, at, filter="data")
+            else:
+                tf.extract(member, at)
 
 
 def extract(path: str, at: str):
     """Extract tar file"""
 
     try:
-        system = platform.system().lower()
-        file_info = detect_from_filename(path)
-
-        if file_info.mime_type == "application/x-7z-compressed":
-            if system in ["linux"]:
-                cmd = f"7z x {path} -o{at}"
+        name = path.lower()
+
+        # a known suffix settles the archive type without asking libmagic
+        if name.endswith(tar_extensions):
+            _extract_tar(path, at)
+            return True
+        elif name.endswith(".7z"):
+            mime_type = "application/x-7z-compressed"
+        elif name.endswith(archive_extensions):
+            mime_type = None
+        else:
+            mime_type = detect_from_filename(path).mime_type
+
+        if mime_type == "application/x-7z-compressed":
+            if py7zr is not None:
+                with py7zr.SevenZipFile(path) as archive:
+                    archive.extractall(at)
+            elif SYSTEM in ["linux"]:
+                cmd = f"7z x {shlex.quote(path)} -o{shlex.quote(at)}"
                 logger.debug("command: " + cmd)
                 sh(cmd)
-            elif system == "windows":
+            elif SYSTEM == "windows":
                 # 'C:\Program Files\\7-zip\\7z.exe'
                 ...
         else:
@@ -252,30 +450,70 @@ def extract(path: str, at: str):
         raise Exception("Invalid file")
 
 
-def listItemsMatcher(patterns: List[str], word: str) -> float:
+_regex_chars = frozenset(".^$*+?{}[]\\|()")
+
+
+@lru_cache(maxsize=128)
+def _compile_patterns(patterns: tuple):
+    """split patterns into plain substrings and compiled regex search methods"""
+
+    plain: List[str] = []
+    regex: list = []
+
+    for pattern in patterns:
+        pattern = pattern.lower()
+        if _regex_chars.isdisjoint(pattern):
+            plain.append(pattern)
+        else:
+            regex.append(re.compile(pattern).search)
+
+    return plain, regex
+
+
+def listItemsMatcher(patterns: List[str], word: str, suffixes: tuple = ()) -> float:
     """
     eg: listItemsMatcher(patterns=['a','b'], word='a-cc') --> 0.5
+    eg: listItemsMatcher(patterns=['a'], word='a.zip', suffixes=('.zip',)) --> 1.0
     """
 
+    return _match_ratio(tuple(patterns), word.lower(), suffixes)
+
+
+@lru_cache(maxsize=1024)
+def _match_ratio(patterns: tuple, word: str, suffixes: tuple) -> float:
     count = 0
+    total = len(patterns) + (1 if suffixes else 0)
 
-    for pattern in patterns:
-        if re.search(pattern.lower(), word.lower()):
+    if suffixes and word.endswith(suffixes):
+        count += 1
+
+    plain, regex = _compile_patterns(patterns)
+
+    for pattern in plain:
+        if pattern in word:
+            count += 1
+
+    for search in regex:
+        if search(word):
             count += 1
 
     if count == 0:
         return 0
 
-    return count / len(patterns)
+    return count / total
+
+
+def threads(funct, data, max_workers=None, return_result: bool = True):
+    """run funct over data in a thread pool, sized for I/O-bound work by default"""
 
+    if max_workers is None:
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
 
-def threads(funct, data, max_workers=5, return_result: bool = True):
     results = []
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         future = executor.map(funct, data)
         if return_result == True:
-            for i in future:
-                results.append(i)
+            results = list(future)
     return results
 
 
@@ -285,18 +523,20 @@ def show_table(
     """rich table"""
 
     def dict_list_tbl(items=List[dict], ignore_keys: list = []):
-        keys = []
+        ignore = set(ignore_keys)
+        keys: dict = {}  # ordered set of column names
         data = []
 
         for item in items:
-            _tmp: tuple = ()
-            for key in [i for i in item.keys() if i not in ignore_keys]:
-                if key not in keys:
-                    keys.append(key)
-                _tmp += (str(item[key]),)
-            data.append(_tmp)
+            row = []
+            for key, value in item.items():
+                if key in ignore:
+                    continue
+                keys.setdefault(key, None)
+                row.append(str(value))
+            data.append(tuple(row))
 
-        return keys, data
+        return list(keys), data
 
     text = Text(title, style=_colors["light_green"])
 
@@ -319,5 +559,4 @@ def show_table(
     for row in rows:
         table.add_row(*row)
 
-    console = Console()
-    console.print(table)
+    get_console().print(table)